@@ -4,11 +4,13 @@
 import streamlit as st
 import numpy as np
 import time
-import random
-from datetime import datetime
+import gc
+import os
+import threading
 import base64
 from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
+from collections import deque
 from streamlit_clickable_images import clickable_images
 import pandas as pd # Import pandas for improved dataframe handling
 
@@ -23,12 +25,36 @@ st.set_page_config(
 # --- Constants & State Mapping ---
 GRID_ROWS = 4
 GRID_COLS = 4
+# Tile labels are fixed, so format them once instead of per tile per render
+GRID_LABELS = [[f"Grid ({r},{c})" for c in range(GRID_COLS)] for r in range(GRID_ROWS)]
 STATE_HEALTHY = 0
 STATE_DISEASED = 1
 STATE_SPRAYING = 2
 STATE_SCANNING = 3
 STATE_SPRAYED = 4
+# (overlay RGBA, label) per status, indexed directly by the state value (0..4) instead of a dict lookup
+STATUS_TABLE = (
+    ((46, 204, 113, 100), "Healthy"),   # STATE_HEALTHY
+    ((231, 76, 60, 150), "Diseased"),   # STATE_DISEASED
+    ((52, 152, 219, 150), "Spraying"),  # STATE_SPRAYING
+    ((241, 196, 15, 150), "Scanning"),  # STATE_SCANNING
+    ((142, 68, 173, 150), "Sprayed"),   # STATE_SPRAYED
+)
+UNKNOWN_STATUS = ((0, 0, 0, 80), "Unknown")
+# Overlay RGBA per status as one uint8 array, built from STATUS_TABLE; the tint blend in _tinted_backgrounds
+# reads colours only from here, so every known-status tile gets its colour through this LUT
+STATUS_RGBA_LUT = np.array([color for color, _ in STATUS_TABLE], dtype=np.uint8)
 IMAGE_PATH = "crop_top_view.png"
+# Tiles are displayed 180px tall; render them at 2x that (for high-DPI screens) rather than at source size
+TILE_RENDER_HEIGHT = 360
+# Label font size: the original 35 scaled to the 360px render height
+TILE_FONT_SIZE = 28
+
+# --- STATIC TILE CONSTANTS: written under ./static so Streamlit serves them (server.enableStaticServing) ---
+TILE_STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "tiles")
+# Relative to the clickable_images iframe (<base>/component/<name>/index.html), so it resolves to
+# <base>/app/static/tiles under any path prefix, whether set via server.baseUrlPath or a reverse proxy
+TILE_STATIC_URL = "../../app/static/tiles"
 
 # --- FONT CONSTANT: MUST MATCH THE FILE ON GITHUB ---
 FONT_PATH = "Roboto-Regular.ttf"
@@ -40,15 +66,51 @@ CAMERA_FEED_URL = "Camera feed.mp4"
 DISEASE_TYPES = ["Blight (Severe)", "Rust (Moderate)", "Powdery Mildew (Moderate)", "Leaf Spot (Low)", "Aphids (Severe)", "Nematodes (Low)"]
 # --- NEW CONSTANT: Pesticide used per grid in Autonomous Cycle ---
 AUTONOMOUS_SPRAY_AMOUNT = 2.5 
+# Pesticide used per grid in a Blanket Spray
+BLANKET_SPRAY_AMOUNT = 1.5
 
 # --- Helper Functions ---
 
-# FIX: Removed @st.cache_data to prevent object serialization errors for image object
+# cache_resource (not cache_data) keeps one decoded Image per process without pickling it.
+# Callers only ever .copy() it, so the shared object is never mutated.
+@st.cache_resource
 def get_base_image(path):
-    try: return Image.open(path).convert("RGBA")
+    try: img = Image.open(path).convert("RGBA")
     except FileNotFoundError: st.error(f"Image file not found at '{path}'. Please ensure it is uploaded to GitHub."); return None
+    # Downsize once (LANCZOS, cost paid once per process) so every blend, text draw and JPEG encode works on display-sized pixels
+    if img.height > TILE_RENDER_HEIGHT:
+        img = img.resize((round(img.width * TILE_RENDER_HEIGHT / img.height), TILE_RENDER_HEIGHT), Image.LANCZOS)
+    return img
+
+# Float32 view of the base image's RGB channels, decoded once for the NumPy overlay blend
+@st.cache_resource
+def get_base_pixels(path):
+    base_img = get_base_image(path)
+    if base_img is None: return None
+    return np.asarray(base_img.convert("RGB"), dtype=np.float32)
+
+# Solid-colour overlays for a batch of colours in one broadcast blend over (n, H, W, 3):
+# out[k] = base*(1-a_k) + color_k*a_k
+def _blend_overlays(base_px, colors):
+    colors = np.asarray(colors, dtype=np.float32)
+    alpha = colors[:, None, None, 3:] / 255.0
+    # Accumulate in one preallocated float32 buffer instead of a fresh full-size temporary per operator
+    out = np.multiply(base_px[None], 1 - alpha, dtype=np.float32)
+    out += colors[:, None, None, :3] * alpha
+    return out.astype(np.uint8)
+
+# The tint depends only on status, so the 5 coloured backgrounds are built once per process
+@st.cache_resource
+def _tinted_backgrounds():
+    base_px = get_base_pixels(IMAGE_PATH)
+    if base_px is None: return None
+    tinted = _blend_overlays(base_px, STATUS_RGBA_LUT)
+    return {status: Image.fromarray(px) for status, px in enumerate(tinted)}
 
 # FIX: Removed @st.cache_data and uses truetype with the file to respect size
+# cache_resource keeps one parsed font per size for the process (a module-level lru_cache would be
+# rebuilt on every run, since Streamlit re-executes this module) instead of re-reading the .ttf per tile
+@st.cache_resource
 def get_font(size):
     try:
         # Use the uploaded font file to ensure size is respected
@@ -57,35 +119,98 @@ def get_font(size):
         # Fall back to default if font file is missing
         return ImageFont.load_default()
 
-def create_grid_image(base_img, status, text):
-    if base_img is None: return None
-    tile = base_img.copy()
-    overlay = Image.new("RGBA", tile.size)
-    draw = ImageDraw.Draw(overlay)
-    status_map = {
-        STATE_HEALTHY: {"color": (46, 204, 113, 100), "label": "Healthy"},
-        STATE_DISEASED: {"color": (231, 76, 60, 150), "label": "Diseased"},
-        STATE_SPRAYING: {"color": (52, 152, 219, 150), "label": "Spraying"},
-        STATE_SCANNING: {"color": (241, 196, 15, 150), "label": "Scanning"},
-        STATE_SPRAYED: {"color": (142, 68, 173, 150), "label": "Sprayed"},
-    }
-    config = status_map.get(status, {"color": (0,0,0,80), "label": "Unknown"})
-    draw.rectangle([(0, 0), tile.size], fill=config["color"])
-    tile = Image.alpha_composite(tile, overlay)
-    draw = ImageDraw.Draw(tile)
-    
-    # FONT SIZE IS SET TO 35
-    font = get_font(35) 
-    
-    full_text = f"{text}\n({config['label']})"
-    text_bbox = draw.textbbox((0, 0), full_text, font=font)
-    text_width, text_height = text_bbox[2] - text_bbox[0], text_bbox[3] - text_bbox[1]
-    text_pos = ((tile.width - text_width) / 2, (tile.height - text_height) / 2)
-    draw.text((text_pos[0]+1, text_pos[1]+1), full_text, font=font, fill="black")
-    draw.text(text_pos, full_text, font=font, fill="white")
+# One throwaway canvas shared by every text measurement (textbbox never draws on it).
+# cache_resource, not a module global: Streamlit re-executes this module on every run.
+@st.cache_resource
+def _measure_draw():
+    return ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+# Label (width, height) per (text, size); there are only 5 x 16 distinct labels, so each is laid out once per process
+@st.cache_resource
+def _text_size(text, size):
+    text_bbox = _measure_draw().textbbox((0, 0), text, font=get_font(size))
+    return text_bbox[2] - text_bbox[0], text_bbox[3] - text_bbox[1]
+
+# Pre-rendered label (white text, black outline) as a transparent sprite cropped to the stroked text's bbox,
+# one per distinct label and process, so a tile render is a small paste instead of FreeType layout + rasterization.
+# Returns (sprite, top-left paste offset on the tile).
+@st.cache_resource
+def _text_layer(full_text, tile_size):
+    font = get_font(TILE_FONT_SIZE)
+    text_width, text_height = _text_size(full_text, TILE_FONT_SIZE)
+    text_pos = ((tile_size[0] - text_width) / 2, (tile_size[1] - text_height) / 2)
+    left, top, right, bottom = _measure_draw().textbbox(text_pos, full_text, font=font, stroke_width=1)
+    left, top = int(np.floor(left)), int(np.floor(top)) # Whole-pixel shift keeps the glyphs' subpixel placement
+    sprite = Image.new("RGBA", (int(np.ceil(right)) - left, int(np.ceil(bottom)) - top), (0, 0, 0, 0))
+    # One stroked pass draws the outline and fill together instead of a shadow draw plus a fill draw
+    ImageDraw.Draw(sprite).text((text_pos[0] - left, text_pos[1] - top), full_text, font=font, fill="white", stroke_width=1, stroke_fill="black")
+    return sprite, (left, top)
+
+# One reusable canvas for composing tiles on a cache miss instead of copying a background per tile.
+# Sessions run on separate threads, so the lock keeps two renders from sharing it at once.
+@st.cache_resource
+def _tile_scratch():
+    tile_size = get_base_image(IMAGE_PATH).size
+    return Image.new("RGB", tile_size), threading.Lock()
+
+# Tiles are a pure function of (status, text): 5 statuses x 16 labels, so cache the encoded JPEG bytes
+@st.cache_data(max_entries=128, ttl=3600)
+def tile_bytes(status: int, text: str) -> bytes:
+    backgrounds = _tinted_backgrounds()
+    if backgrounds is None: return None
+    if 0 <= status < len(STATUS_TABLE):
+        # Known statuses use the LUT-tinted background; only the label comes from STATUS_TABLE
+        background, label = backgrounds[status], STATUS_TABLE[status][1]
+    else:
+        unknown_color, label = UNKNOWN_STATUS
+        background = Image.fromarray(_blend_overlays(get_base_pixels(IMAGE_PATH), [unknown_color])[0])
+    full_text = f"{text}\n({label})"
     buffered = BytesIO()
-    tile.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
+    scratch, scratch_lock = _tile_scratch()
+    with scratch_lock:
+        # The shared measuring canvas and font are used from session threads, so lay out under the lock too
+        sprite, sprite_pos = _text_layer(full_text, background.size)
+        scratch.paste(background)
+        scratch.paste(sprite, sprite_pos, sprite)
+        # JPEG (libjpeg-turbo inside Pillow) encodes the opaque tile several times faster than PNG's DEFLATE
+        scratch.save(buffered, format="JPEG", quality=85)
+    return buffered.getvalue()
+
+# Data URL form of the same tile, only needed by clickable_images on the dashboard
+@st.cache_data(max_entries=128, ttl=3600)
+def tile_data_url(status: int, text: str) -> str:
+    jpeg = tile_bytes(status, text)
+    if jpeg is None: return None
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg).decode()
+
+# Writes every possible tile (5 statuses x 16 cells) to the static folder once per process, so the
+# dashboard can reference them by URL and the browser caches them instead of receiving base64 each rerun
+@st.cache_resource
+def export_static_tiles():
+    if not st.get_option("server.enableStaticServing"): return False
+    try:
+        os.makedirs(TILE_STATIC_DIR, exist_ok=True)
+        for status in range(len(STATUS_TABLE)):
+            for r in range(GRID_ROWS):
+                for c in range(GRID_COLS):
+                    jpeg = tile_bytes(status, GRID_LABELS[r][c])
+                    if jpeg is None: return False
+                    with open(os.path.join(TILE_STATIC_DIR, f"{status}_{r}_{c}.jpg"), "wb") as tile_file:
+                        tile_file.write(jpeg)
+    except OSError:
+        # Read-only deployments fall back to inline data URLs
+        return False
+    return True
+
+# All 16 dashboard tile URLs for one grid state, keyed by grid_status.tobytes() so reruns
+# that didn't change the grid (slider, selectbox, ...) are a single cache lookup
+@st.cache_data(max_entries=64)
+def build_tile_urls(status_bytes: bytes) -> list[str]:
+    # One tolist() gives plain ints, instead of boxing a NumPy scalar per tile
+    flat = np.frombuffer(status_bytes, dtype=np.uint8).tolist()
+    if export_static_tiles():
+        return [f"{TILE_STATIC_URL}/{flat[i]}_{i // GRID_COLS}_{i % GRID_COLS}.jpg" for i in range(GRID_ROWS * GRID_COLS)]
+    return [tile_data_url(flat[i], GRID_LABELS[i // GRID_COLS][i % GRID_COLS]) for i in range(GRID_ROWS * GRID_COLS)]
 
 # NEW: Function to encode the video file into a Base64 string for embedding
 def get_video_base64(path):
@@ -98,9 +223,24 @@ def get_video_base64(path):
         st.error(f"Video file not found at '{path}'. Please ensure it is uploaded to GitHub.")
         return None
 
+# The embedded video never changes, so read, encode and format it once (st.error is replayed on cache hits)
+@st.cache_data(max_entries=1)
+def get_video_html(path):
+    video_base64 = get_video_base64(path)
+    if not video_base64: return None
+    # Uses Base64 embedding to ensure autoplay, loop, mute, and NO controls
+    return f"""
+        <video width="100%" height="auto" autoplay loop muted playspinslane>
+            <source src="data:video/mp4;base64,{video_base64}" type="video/mp4">
+            Your browser does not support the video tag.
+        </video>
+        """
+
+# event_log is a deque(maxlen=20): appendleft is O(1) and drops the oldest entry automatically
+# The joined HTML is rebuilt only here, so reruns and animation frames just reuse it
 def add_to_log(message):
-    st.session_state.event_log.insert(0, f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
-    if len(st.session_state.event_log) > 20: st.session_state.event_log.pop()
+    st.session_state.event_log.appendleft(f"[{time.strftime('%H:%M:%S')}] {message}")
+    st.session_state._log_html = "<br>".join(st.session_state.event_log)
 
 # NEW: Function to determine urgency based on disease name
 def get_urgency_level(disease_name):
@@ -111,17 +251,20 @@ def get_urgency_level(disease_name):
     else: # Low, or any other unknown disease
         return "Low 🟡"
 
+# Urgency of every known disease, resolved once instead of string-searched per table row
+DISEASE_URGENCY = {name: get_urgency_level(name) for name in DISEASE_TYPES}
+
 # --- State Initialization ---
 if 'initialized' not in st.session_state:
-    st.session_state.grid_status = np.full((GRID_ROWS, GRID_COLS), STATE_HEALTHY, dtype=int)
+    st.session_state.grid_status = np.full((GRID_ROWS, GRID_COLS), STATE_HEALTHY, dtype=np.uint8)
     st.session_state.tank_level = 100.0
     st.session_state.battery_level = 100.0
     st.session_state.sprayed_plots_count = 0
-    st.session_state.event_log = []
+    st.session_state.event_log = deque(maxlen=20)
     st.session_state.system_status = "Idle"
     st.session_state.view = "dashboard"
-    # NEW STATE: Stores results of the last scan
-    st.session_state.last_scan_results = None 
+    # NEW STATE: Stores results of the last scan (as the ready-to-show review table)
+    st.session_state.last_scan_df = None 
     st.session_state.initialized = True
     add_to_log("System Initialized. Ready for operation.")
 
@@ -146,22 +289,57 @@ st.markdown("""
         padding: 0;
         font-size: 3.5rem;
     }
+    .log-panel {
+        background-color: #1F2937;
+        border-radius: 10px;
+        padding: 10px;
+        height: 200px;
+        overflow-y: auto;
+        border: 1px solid #4B5563;
+        font-family: monospace;
+    }
+    .spray-progress {
+        height: 0.5rem;
+        margin-top: 0.25rem;
+        border-radius: 0.25rem;
+        background-color: #4B5563;
+        overflow: hidden;
+    }
+    .spray-progress-fill {
+        width: 0;
+        height: 100%;
+        background: linear-gradient(90deg, #2193b0, #2ecc71);
+        animation-name: spray-fill;
+        animation-timing-function: linear;
+        animation-fill-mode: forwards;
+    }
+    @keyframes spray-fill {
+        from { width: 0%; }
+        to { width: 100%; }
+    }
 </style>
 """, unsafe_allow_html=True)
 
 
+# --- View switch callbacks ---
+# on_click callbacks run before the script, so the same run renders the new view (no second st.rerun pass)
+def set_view(view):
+    st.session_state.view = view
+
+def queue_manual_spray():
+    st.session_state.manual_target = {"coords": (st.session_state.row_sel, st.session_state.col_sel), "amount": st.session_state.manual_amount}
+    st.session_state.view = "manual_spray"
+
 # --- Sidebar Controls ---
 is_running = st.session_state.system_status != "Idle"
 with st.sidebar:
     st.header("⚙️ System Controls")
     st.divider()
     st.subheader("Autonomous Cycle") # CHANGED: "Autonomous Mode" to "Autonomous Cycle"
-    if st.button("▶️ Start Autonomous Cycle", use_container_width=True, type="primary", disabled=is_running):
-        st.session_state.view = "autonomous_cycle"
-        st.rerun()
+    st.button("▶️ Start Autonomous Cycle", use_container_width=True, type="primary", disabled=is_running, on_click=set_view, args=("autonomous_cycle",))
 
     # NEW BUTTON ADDED HERE with Tooltip for disabled state
-    scan_review_disabled = is_running or st.session_state.last_scan_results is None
+    scan_review_disabled = is_running or st.session_state.last_scan_df is None
     
     tooltip_message = "Complete Autonomous Scan first."
     
@@ -170,25 +348,18 @@ with st.sidebar:
         with st.empty():
              st.button("🔎 Review Last Scan", use_container_width=True, disabled=True, help=tooltip_message)
     else:
-        if st.button("🔎 Review Last Scan", use_container_width=True, disabled=False):
-            st.session_state.view = "review_scan"
-            st.rerun()
+        st.button("🔎 Review Last Scan", use_container_width=True, disabled=False, on_click=set_view, args=("review_scan",))
 
 
     st.divider()
     st.subheader("Manual Spray")
-    row_sel = st.selectbox("Select Row", range(GRID_ROWS), disabled=is_running)
-    col_sel = st.selectbox("Select Column", range(GRID_COLS), disabled=is_running)
-    manual_amount = st.slider("Pesticide Amount (%)", 1.0, 10.0, 2.5, 0.5, disabled=is_running)
-
-    if st.button("Spray Selected Grid", use_container_width=True, disabled=is_running):
-        st.session_state.view = "manual_spray"
-        st.session_state.manual_target = {"coords": (row_sel, col_sel), "amount": manual_amount}
-        st.rerun()
+    st.selectbox("Select Row", range(GRID_ROWS), disabled=is_running, key="row_sel")
+    st.selectbox("Select Column", range(GRID_COLS), disabled=is_running, key="col_sel")
+    st.slider("Pesticide Amount (%)", 1.0, 10.0, 2.5, 0.5, disabled=is_running, key="manual_amount")
+
+    st.button("Spray Selected Grid", use_container_width=True, disabled=is_running, on_click=queue_manual_spray)
     
-    if st.button("🚨 Spray Entire Field", use_container_width=True, disabled=is_running):
-        st.session_state.view = "blanket_spray"
-        st.rerun()
+    st.button("🚨 Spray Entire Field", use_container_width=True, disabled=is_running, on_click=set_view, args=("blanket_spray",))
         
 # --- Main View Controller ---
 
@@ -220,16 +391,47 @@ with video_col:
 # Progress bar placeholder (used during animation)
 progress_placeholder = st.empty() 
 
+# Event log slots; the panel styling lives in the .log-panel class so only the lines are sent
+log_header_placeholder = st.empty()
+log_placeholder = st.empty()
+
+# Per-cell placeholders for the animation grid and the status each one last showed.
+# Built on the first animation frame of a run so later frames only redraw changed cells.
+cell_placeholders = None
+last_cell_status = None
+
+# --- Paint a single animation cell, skipping it if it already shows this status ---
+def paint_cell(r, c, status):
+    global cell_placeholders, last_cell_status
+    if cell_placeholders is None:
+        map_header_placeholder.subheader("1 Acre - 4x4 Grids")
+        with grid_placeholder.container():
+            cols = st.columns(GRID_COLS)
+            cell_placeholders = [[cols[col].empty() for col in range(GRID_COLS)] for _ in range(GRID_ROWS)]
+        last_cell_status = np.full((GRID_ROWS, GRID_COLS), -1)
+    if status == last_cell_status[r, c]: return
+    # st.image takes the raw bytes directly, so the animation path skips base64 entirely
+    jpeg = tile_bytes(int(status), GRID_LABELS[r][c])
+    if jpeg is None: return
+    # Note: In the animation view, st.image scales, but the overall height should now be consistent 
+    cell_placeholders[r][c].image(jpeg, output_format="JPEG")
+    last_cell_status[r, c] = status
+
+# --- Progress bar animated by the browser: one element per spray instead of 100 server updates ---
+def run_progress_bar(text, duration):
+    progress_placeholder.markdown(f'{text}<div class="spray-progress"><div class="spray-progress-fill" style="animation-duration:{duration}s"></div></div>', unsafe_allow_html=True)
+    time.sleep(duration)
+    progress_placeholder.empty()
+
 # --- Update function shared by dashboard and animation ---
 def update_static_display(status_array, is_dashboard_view=False):
     base_image = get_base_image(IMAGE_PATH)
     if not base_image: return
     
-    map_header_placeholder.subheader("1 Acre - 4x4 Grids")
-    
-    with grid_placeholder.container():
-        if is_dashboard_view:
-            images_b64 = [f"data:image/png;base64,{create_grid_image(base_image, st.session_state.grid_status[r,c], f'Grid ({r},{c})')}" for r in range(GRID_ROWS) for c in range(GRID_COLS)]
+    if is_dashboard_view:
+        map_header_placeholder.subheader("1 Acre - 4x4 Grids")
+        with grid_placeholder.container():
+            images_b64 = build_tile_urls(st.session_state.grid_status.tobytes())
             
             # FIX: Increased image height to 180px for better vertical alignment
             clicked_index = clickable_images(images_b64, titles=[f"Grid {i}" for i in range(len(images_b64))], div_style={"display": "grid", "grid-template-columns": f"repeat({GRID_COLS}, 1fr)", "gap": "8px"}, img_style={"height": "180px", "width": "100%", "object-fit": "cover", "border-radius": "10px", "cursor": "pointer"})
@@ -240,38 +442,44 @@ def update_static_display(status_array, is_dashboard_view=False):
                     st.session_state.grid_status[r, c] = STATE_DISEASED
                     add_to_log(f"Manual Inspection: Disease marked at Grid ({r},{c}).")
                     st.rerun()
-        else:
-            cols = st.columns(GRID_COLS)
-            for i in range(GRID_ROWS * GRID_COLS):
-                r, c = i // GRID_COLS, i % GRID_COLS
-                img_b64 = create_grid_image(base_image, status_array[r, c], f'Grid ({r},{c})')
-                # Note: In the animation view, st.image scales, but the overall height should now be consistent 
-                cols[c].image(f"data:image/png;base64,{img_b64}")
+    else:
+        for r in range(GRID_ROWS):
+            for c in range(GRID_COLS):
+                paint_cell(r, c, status_array[r, c])
 
 # --- Video/Log update utility ---
 def update_video_and_log():
     # Video
     video_header_placeholder.subheader("📹 Live Feed")
     
-    video_base64 = get_video_base64(CAMERA_FEED_URL)
-
-    if video_base64:
-        # Uses Base64 embedding to ensure autoplay, loop, mute, and NO controls
-        html_video = f"""
-        <video width="100%" height="auto" autoplay loop muted playspinslane>
-            <source src="data:video/mp4;base64,{video_base64}" type="video/mp4">
-            Your browser does not support the video tag.
-        </video>
-        """
+    html_video = get_video_html(CAMERA_FEED_URL)
+    if html_video:
         video_player_placeholder.markdown(html_video, unsafe_allow_html=True)
     # else: If video fails to load, the error message is displayed by get_video_base64()
 
 
     # Log
-    st.subheader("📜 Event Log")
-    log_content = "<br>".join(st.session_state.event_log)
-    st.markdown(f'<div style="background-color:#1F2937; border-radius:10px; padding:10px; height:200px; overflow-y:auto; border:1px solid #4B5563; font-family:monospace;">{log_content}</div>', unsafe_allow_html=True)
-
+    log_header_placeholder.subheader("📜 Event Log")
+    log_placeholder.markdown(f'<div class="log-panel">{st.session_state._log_html}</div>', unsafe_allow_html=True)
+
+
+# --- Mark the given cells as treated and draw their pesticide from the tank ---
+# rows/cols may be scalars or index arrays; returns (new_tank_level, grids_treated)
+def apply_spray(grid, rows, cols, tank_level, per_cell_cost):
+    grid[rows, cols] = STATE_SPRAYED
+    treated = int(np.size(rows))
+    return max(0, tank_level - per_cell_cost * treated), treated
+
+# --- Shared teardown for the animation views ---
+# Drops per-action state (only plain values live in session_state; images stay in st.cache_*)
+# and collects the frame temporaries before returning to the dashboard.
+# The cell placeholders need no reset: st.rerun() re-executes the script in a fresh module namespace.
+def finish_action():
+    st.session_state.pop("manual_target", None)
+    st.session_state.system_status = "Idle"
+    st.session_state.view = "dashboard"
+    gc.collect()
+    st.rerun()
 
 ## --- VIEW LOGIC ---
 if st.session_state.view == "dashboard":
@@ -286,30 +494,18 @@ elif st.session_state.view == "review_scan":
 
     st.subheader("Last Autonomous Scan Findings")
 
-    if st.session_state.last_scan_results and len(st.session_state.last_scan_results) > 0:
-        
-        # Prepare data for display
-        results_data = [{
-            "Grid Coords": f"({r['coords'][0]}, {r['coords'][1]})", 
-            "Detected Disease": r['disease'].split(" (")[0], # Show only the name
-            "Urgency": get_urgency_level(r['disease']), # NEW: Urgency level
-            "Pesticide Used": f"{AUTONOMOUS_SPRAY_AMOUNT:.1f} %" # NEW: Pesticide used
-        } for r in st.session_state.last_scan_results]
+    df = st.session_state.last_scan_df
+    if df is not None and len(df) > 0:
         
-        st.success(f"Scan found **{len(results_data)}** plots requiring attention.")
+        st.success(f"Scan found **{len(df)}** plots requiring attention.")
         
-        # Use Pandas DataFrame for better table display with colors
-        df = pd.DataFrame(results_data)
-
         st.dataframe(df, hide_index=True, use_container_width=True)
 
     else:
         st.warning("No disease was detected in the last scan, or no scan data is available. Please run an Autonomous Cycle first.")
 
     st.divider()
-    if st.button("← Back to Dashboard", type="primary"):
-        st.session_state.view = "dashboard"
-        st.rerun()
+    st.button("← Back to Dashboard", type="primary", on_click=set_view, args=("dashboard",))
 
 else: 
     update_video_and_log()
@@ -319,63 +515,47 @@ else:
         st.session_state.system_status = "Scanning"
         add_to_log("🤖 Autonomous scan initiated on main grid...")
         
-        num_diseased = random.randint(3, 5)
-        all_coords = [(r, c) for r in range(GRID_ROWS) for c in range(GRID_COLS)]
-        diseased_coords = set(random.sample(all_coords, num_diseased)) 
-        
-        current_status = st.session_state.grid_status.copy()
-        scan_results_to_store = [] # Temporarily store results during scan
+        rng = np.random.default_rng()
+        num_diseased = rng.integers(3, 6) # 3-5 diseased plots
+        # Flat cell indices in row-major order, split into row/column index arrays for fancy indexing
+        diseased_idx = np.sort(rng.choice(GRID_ROWS * GRID_COLS, num_diseased, replace=False))
+        diseased_rows, diseased_cols = np.divmod(diseased_idx, GRID_COLS)
 
         # Step 1: Simulate Instant Scanning (Show all yellow quickly)
-        for r in range(GRID_ROWS):
-            for c in range(GRID_COLS):
-                current_status[r, c] = STATE_SCANNING
-        update_static_display(current_status) 
+        update_static_display(np.full((GRID_ROWS, GRID_COLS), STATE_SCANNING, dtype=np.uint8))
         time.sleep(0.5) # Wait half a second for the "scan flash"
         
         # Step 2: Determine and Apply Final States (Instantly)
-        for r in range(GRID_ROWS):
-            for c in range(GRID_COLS):
-                is_diseased = (r, c) in diseased_coords
-                
-                if is_diseased:
-                    final_state = STATE_DISEASED
-                    detected_disease = random.choice(DISEASE_TYPES)
-                    scan_results_to_store.append({"coords": (r, c), "disease": detected_disease})
-                else:
-                    final_state = STATE_HEALTHY 
-                    
-                st.session_state.grid_status[r, c] = final_state 
-                current_status[r, c] = final_state
+        st.session_state.grid_status[:] = STATE_HEALTHY
+        st.session_state.grid_status[diseased_rows, diseased_cols] = STATE_DISEASED
+        # Draw every disease type in one call; tolist() hands back plain strs
+        diseases = rng.choice(DISEASE_TYPES, num_diseased).tolist()
+        update_static_display(st.session_state.grid_status)
         
-        # Update the grid to final results instantly
-        update_static_display(current_status) 
         time.sleep(0.5) # Wait half a second after results appear before moving to spraying
 
-        # STORE FINAL SCAN RESULTS
-        st.session_state.last_scan_results = scan_results_to_store
+        # STORE FINAL SCAN RESULTS, already shaped as the review table (built column by column, once per scan)
+        st.session_state.last_scan_df = pd.DataFrame({
+            "Grid Coords": [f"({r}, {c})" for r, c in zip(diseased_rows.tolist(), diseased_cols.tolist())],
+            "Detected Disease": [d.split(" (")[0] for d in diseases], # Show only the name
+            "Urgency": [DISEASE_URGENCY[d] for d in diseases], # NEW: Urgency level
+            "Pesticide Used": f"{AUTONOMOUS_SPRAY_AMOUNT:.1f} %", # NEW: Pesticide used (same for every plot)
+        })
         
-        add_to_log(f"✅ Scan complete. Found {len(st.session_state.last_scan_results)} diseased plots.")
+        add_to_log(f"✅ Scan complete. Found {len(st.session_state.last_scan_df)} diseased plots.")
         st.session_state.system_status = "Spraying"
         add_to_log("💧 Initiating simultaneous targeted spraying..."); time.sleep(1)
 
-        for r_plot, c_plot in diseased_coords:
-            st.session_state.grid_status[r_plot, c_plot] = STATE_SPRAYING
+        st.session_state.grid_status[diseased_rows, diseased_cols] = STATE_SPRAYING
         update_static_display(st.session_state.grid_status)
         
-        bar = progress_placeholder.progress(0, text=f"Spraying {len(diseased_coords)} grids...")
-        for i in range(100): time.sleep(0.1); bar.progress(i + 1)
-        progress_placeholder.empty()
-
-        for r_plot, c_plot in diseased_coords:
-            st.session_state.grid_status[r_plot, c_plot] = STATE_SPRAYED
-            st.session_state.sprayed_plots_count += 1
-            st.session_state.tank_level = max(0, st.session_state.tank_level - AUTONOMOUS_SPRAY_AMOUNT)
-        add_to_log(f"✅ {len(diseased_coords)} grids have been treated.")
+        run_progress_bar(f"Spraying {num_diseased} grids...", 10)
+
+        st.session_state.tank_level, treated = apply_spray(st.session_state.grid_status, diseased_rows, diseased_cols, st.session_state.tank_level, AUTONOMOUS_SPRAY_AMOUNT)
+        st.session_state.sprayed_plots_count += treated
+        add_to_log(f"✅ {treated} grids have been treated.")
         
-        st.session_state.system_status = "Idle"
-        st.session_state.view = "dashboard"
-        st.rerun()
+        finish_action()
 
     # --- Logic for Manual Spray ---
     elif st.session_state.view == "manual_spray":
@@ -386,48 +566,34 @@ else:
         st.session_state.grid_status[r, c] = STATE_SPRAYING
         update_static_display(st.session_state.grid_status)
         
-        bar = progress_placeholder.progress(0, text=f"Spraying Grid ({r},{c})...")
-        for i in range(100): time.sleep(0.1); bar.progress(i + 1)
-        progress_placeholder.empty()
+        run_progress_bar(f"Spraying Grid ({r},{c})...", 10)
 
-        st.session_state.grid_status[r, c] = STATE_SPRAYED
-        st.session_state.tank_level = max(0, st.session_state.tank_level - amount)
-        st.session_state.sprayed_plots_count += 1
+        st.session_state.tank_level, treated = apply_spray(st.session_state.grid_status, r, c, st.session_state.tank_level, amount)
+        st.session_state.sprayed_plots_count += treated
         add_to_log(f"✅ Grid ({r},{c}) has been treated.")
         
-        del st.session_state.manual_target
-        st.session_state.system_status = "Idle"
-        st.session_state.view = "dashboard"
-        st.rerun()
+        finish_action()
 
     # --- Logic for Blanket Spray ---
     elif st.session_state.view == "blanket_spray":
         st.session_state.system_status = "Spraying"
         add_to_log("📢 Simultaneous blanket spray initiated for all grids.")
         
-        for r in range(GRID_ROWS):
-            for c in range(GRID_COLS):
-                st.session_state.grid_status[r, c] = STATE_SPRAYING
+        # Plan once: grids are treated in row-major order while any pesticide is left
+        affordable = min(GRID_ROWS * GRID_COLS, int(np.ceil(st.session_state.tank_level / BLANKET_SPRAY_AMOUNT)))
+        rows, cols = np.divmod(np.arange(affordable), GRID_COLS)
+
+        st.session_state.grid_status[:] = STATE_SPRAYING
         update_static_display(st.session_state.grid_status)
 
-        bar = progress_placeholder.progress(0, text=f"Spraying all 16 grids...")
-        for i in range(100): time.sleep(0.15); bar.progress(i + 1)
-        progress_placeholder.empty()
+        run_progress_bar("Spraying all 16 grids...", 15)
 
-        plots_actually_sprayed = 0
-        for r in range(GRID_ROWS):
-            for c in range(GRID_COLS):
-                if st.session_state.tank_level > 0:
-                    st.session_state.grid_status[r, c] = STATE_SPRAYED
-                    st.session_state.tank_level = max(0, st.session_state.tank_level - 1.5)
-                    st.session_state.sprayed_plots_count += 1
-                    plots_actually_sprayed += 1
-                else:
-                    st.session_state.grid_status[r, c] = STATE_HEALTHY # Revert if no pesticide left
+        # Each cell is written exactly once: the uncovered tail reverts, the covered head is sprayed
+        st.session_state.grid_status.reshape(-1)[affordable:] = STATE_HEALTHY # Revert if no pesticide left
+        st.session_state.tank_level, plots_actually_sprayed = apply_spray(st.session_state.grid_status, rows, cols, st.session_state.tank_level, BLANKET_SPRAY_AMOUNT)
+        st.session_state.sprayed_plots_count += plots_actually_sprayed
         
         if plots_actually_sprayed < GRID_ROWS * GRID_COLS:
             add_to_log(f"⚠️ Tank empty. Only {plots_actually_sprayed} grids were treated.")
         add_to_log("✅ Blanket spray complete.")
-        st.session_state.system_status = "Idle"
-        st.session_state.view = "dashboard"
-        st.rerun()
+        finish_action()